@@ -0,0 +1,390 @@
+"""JMAP client for the Fastmail API, shared by the MCP server and its entry points."""
+import os
+import time
+import asyncio
+import hashlib
+import tempfile
+import http.cookiejar
+import httpx
+import orjson
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+SESSION_URL = "https://api.fastmail.com/jmap/session"
+
+# Pre-parsed so httpx copies the URL instead of re-parsing a string per request.
+_SESSION_ENDPOINT = httpx.URL(SESSION_URL)
+
+_USING = ("urn:ietf:params:jmap:core", "urn:ietf:params:jmap:mail")
+
+# Upper bound on the body text the server returns for a single email, so a
+# huge message cannot balloon the response we buffer and decode.
+MAX_BODY_VALUE_BYTES = 256 * 1024
+
+# Upper bound on the body text (in characters) the per-client email cache holds.
+EMAIL_CACHE_BYTES = 4 * 1024 * 1024
+
+_SUMMARY_PROPERTIES = ["id", "subject", "from", "receivedAt", "preview"]
+
+# Email/get arguments (besides accountId/ids) for rendering a full email.
+# bodyProperties applies to textBody and attachments alike, so it keeps the
+# name/size fields the attachment list shows.
+_DETAIL_GET_ARGS = {
+    "properties": ["id", "subject", "from", "to", "cc", "bcc", "receivedAt", "sentAt", "textBody", "bodyValues", "attachments"],
+    "bodyProperties": ["partId", "type", "name", "size"],
+    "fetchTextBodyValues": True,
+    "maxBodyValueBytes": MAX_BODY_VALUE_BYTES
+}
+
+
+def by_cid(result: dict) -> dict[str, tuple[str, dict]]:
+    """Index a JMAP response's methodResponses by the client id we sent."""
+    return {r[2]: (r[0], r[1]) for r in result.get("methodResponses", [])}
+
+
+def response_list(responses: dict[str, tuple[str, dict]], cid: str, method: str) -> list:
+    """Return the "list" of a method response, or [] if it is missing or an error."""
+    name, args = responses.get(cid, ("", {}))
+    return args.get("list", []) if name == method else []
+
+
+_SESSION_CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", "~/.cache")).expanduser() / "fastmail-mcp"
+_SESSION_CACHE_TTL = 86400
+
+
+def _session_cache_path(api_token: str) -> Path:
+    key = hashlib.sha256(api_token.encode()).hexdigest()[:16]
+    return _SESSION_CACHE_DIR / f"{key}.json"
+
+
+def _load_cached_session(api_token: str) -> Optional[dict]:
+    """Return the on-disk JMAP session for this token if it has not expired."""
+    try:
+        cached = orjson.loads(_session_cache_path(api_token).read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if not isinstance(cached, dict) or not cached.get("expires_at", 0) > time.time():
+        return None
+    return cached.get("session")
+
+
+def _store_cached_session(api_token: str, session_data: dict) -> None:
+    """Atomically persist the JMAP session so new processes can skip the fetch."""
+    try:
+        _SESSION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(_SESSION_CACHE_DIR / ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            fd, tmp_path = tempfile.mkstemp(dir=_SESSION_CACHE_DIR, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(orjson.dumps({"session": session_data, "expires_at": time.time() + _SESSION_CACHE_TTL}))
+                os.replace(tmp_path, _session_cache_path(api_token))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+    except OSError:
+        pass
+
+
+def _drop_cached_session(api_token: str) -> None:
+    try:
+        _session_cache_path(api_token).unlink()
+    except OSError:
+        pass
+
+
+# One HTTP/2 connection pool for every FastmailClient: all traffic goes to
+# api.fastmail.com, so per-token clients multiplex over the same connections.
+# Credentials are sent per request, and the cookie jar refuses every cookie
+# so one token's Set-Cookie is never replayed on another token's requests.
+# Closed by aclose_http() at shutdown.
+_HTTP = httpx.AsyncClient(
+    http2=True,
+    cookies=http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[])),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+    timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0),
+    headers={"Content-Type": "application/json"}
+)
+
+
+async def aclose_http():
+    await _HTTP.aclose()
+
+
+class FastmailClient:
+    def __init__(self, api_token: str):
+        self.api_token = api_token
+        self.session_data = None
+        self.account_id = None
+        self.api_url = None
+        self._api_endpoint: Optional[httpx.URL] = None
+        self.client = _HTTP
+        self._headers = {"Authorization": f"Bearer {api_token}"}
+        self._mailbox_map: Optional[dict[str, str]] = None
+        self._mailbox_map_ts = 0.0
+        self._mailbox_cache_ttl = 300
+        self._mailbox_miss_refetch_interval = 30
+        self._mailboxes_result: Optional[tuple[dict, float]] = None
+        self._search_cache: OrderedDict[tuple, tuple[dict, float]] = OrderedDict()
+        self._search_cache_size = 32
+        self._search_cache_ttl = 45
+        # Bounded by body text as well as count: at most EMAIL_CACHE_BYTES per
+        # client, so with fastmail_mcp's 16 cached clients a process holds
+        # roughly 64 MiB of cached body text in the worst case.
+        self._email_cache: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        self._email_cache_size = 128
+        self._email_cache_bytes = 0
+        self._session_lock = asyncio.Lock()
+        self._mailbox_lock = asyncio.Lock()
+
+        cached_session = _load_cached_session(api_token)
+        if cached_session:
+            try:
+                self._set_session(cached_session)
+            except (KeyError, TypeError):
+                self.session_data = None
+
+    def _set_session(self, session_data: dict):
+        self.account_id = session_data["primaryAccounts"]["urn:ietf:params:jmap:mail"]
+        self.api_url = session_data["apiUrl"]
+        self._api_endpoint = httpx.URL(self.api_url)
+        self.session_data = session_data
+
+    def _drop_session(self):
+        """Forget the session in memory and on disk so the next call re-fetches it."""
+        self.session_data = None
+        self.account_id = None
+        self.api_url = None
+        self._api_endpoint = None
+        _drop_cached_session(self.api_token)
+
+    async def get_session(self):
+        if self.session_data is None:
+            fetched = None
+            async with self._session_lock:
+                if self.session_data is None:
+                    response = await self.client.get(_SESSION_ENDPOINT, headers=self._headers)
+                    response.raise_for_status()
+                    self._set_session(orjson.loads(response.content))
+                    fetched = self.session_data
+            if fetched is not None:
+                # The disk write takes a cross-process flock; keep it off the
+                # event loop and outside the session lock.
+                await asyncio.to_thread(_store_cached_session, self.api_token, fetched)
+        return self.session_data
+
+    async def make_jmap_request(self, method_calls: list) -> dict:
+        await self.get_session()
+        if not self.api_url:
+            raise ValueError("API URL not available - session may have failed")
+        payload = {
+            "using": _USING,
+            "methodCalls": method_calls
+        }
+        content = orjson.dumps(payload)
+        response = await self.client.post(self._api_endpoint, headers=self._headers, content=content)
+        if response.status_code == 401:
+            # A cached session can outlive the apiUrl or credentials it was
+            # issued for; fetch a fresh one and retry once.
+            self._drop_session()
+            await self.get_session()
+            response = await self.client.post(self._api_endpoint, headers=self._headers, content=content)
+            if response.status_code == 401:
+                self._drop_session()
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    async def search_emails(self, query: str = "", limit: int = 10, mailbox: Optional[str] = None) -> dict:
+        return await self.search_and_fetch(query, limit, mailbox)
+
+    async def search_and_fetch(self, query: str = "", limit: int = 10, mailbox: Optional[str] = None, with_body: bool = False) -> dict:
+        """Search emails, optionally fetching full bodies in the same JMAP request."""
+        # Results with full bodies are not kept here: _remember_emails below
+        # already caches those emails, and holding them twice costs memory.
+        cache_key = (query, limit, mailbox.lower() if mailbox else None)
+        cached = None if with_body else self._search_cache.get(cache_key)
+        if cached and cached[1] > time.monotonic():
+            self._search_cache.move_to_end(cache_key)
+            return cached[0]
+
+        await self.get_session()
+        filter_conditions = {}
+        
+        if query:
+            filter_conditions["text"] = query
+        
+        if mailbox:
+            mailbox_id = await self.get_mailbox_id(mailbox)
+            if mailbox_id:
+                filter_conditions["inMailbox"] = mailbox_id
+        
+        method_calls = [
+            ["Email/query", {
+                "accountId": self.account_id,
+                "filter": filter_conditions if filter_conditions else None,
+                "sort": [{"property": "receivedAt", "isAscending": False}],
+                "limit": limit
+            }, "q1"],
+            ["Email/get", {
+                "accountId": self.account_id,
+                "#ids": {
+                    "resultOf": "q1",
+                    "name": "Email/query",
+                    "path": "/ids"
+                },
+                **(_DETAIL_GET_ARGS if with_body else {"properties": _SUMMARY_PROPERTIES})
+            }, "g1"]
+        ]
+        
+        # JMAP result references can only replace a whole argument, so the
+        # inMailbox filter cannot point at a Mailbox/get in the same batch.
+        # Instead, warm the mailbox cache for free while it is cold so the
+        # next mailbox-filtered search needs a single round-trip.
+        prime_mailboxes = not self._mailbox_map_fresh()
+        if prime_mailboxes:
+            method_calls.append(self._mailbox_get_call())
+        
+        result = await self.make_jmap_request(method_calls)
+        responses = by_cid(result)
+        if "inMailbox" in filter_conditions and responses.get("q1", ("",))[0] == "error":
+            self.invalidate_mailboxes()
+        if prime_mailboxes and responses.get("m1", ("",))[0] == "Mailbox/get":
+            self._remember_mailboxes(response_list(responses, "m1", "Mailbox/get"))
+        if with_body:
+            self._remember_emails(response_list(responses, "g1", "Email/get"))
+        if not with_body and all(responses.get(cid, ("error",))[0] != "error" for cid in ("q1", "g1")):
+            self._search_cache[cache_key] = (result, time.monotonic() + self._search_cache_ttl)
+            self._search_cache.move_to_end(cache_key)
+            while len(self._search_cache) > self._search_cache_size:
+                self._search_cache.popitem(last=False)
+        return result
+
+    async def get_email(self, email_id: str) -> dict:
+        return await self.get_emails([email_id])
+
+    async def get_emails(self, email_ids: list[str]) -> dict:
+        """Fetch several full emails with a single Email/get call.
+
+        Delivered emails are immutable, so previously fetched ones are served
+        from an in-process LRU cache and only the misses go to the server.
+        If that Email/get fails, the cached emails are still returned and the
+        response carries an "error" entry with the JMAP error type and the ids
+        that could not be fetched.
+        """
+        found = {}
+        for email_id in email_ids:
+            if email_id in self._email_cache:
+                self._email_cache.move_to_end(email_id)
+                found[email_id] = self._email_cache[email_id][0]
+        missing = [email_id for email_id in email_ids if email_id not in found]
+        not_found = []
+        error = None
+        
+        if missing:
+            await self.get_session()
+            method_calls = [
+                ["Email/get", {
+                    "accountId": self.account_id,
+                    "ids": missing,
+                    **_DETAIL_GET_ARGS
+                }, "g1"]
+            ]
+            
+            result = await self.make_jmap_request(method_calls)
+            name, args = by_cid(result).get("g1", ("", {}))
+            if name == "Email/get":
+                self._remember_emails(args.get("list", []))
+                found.update((email["id"], email) for email in args.get("list", []))
+                not_found = args.get("notFound") or []
+            else:
+                error = {"type": args.get("type", "unknown") if name == "error" else "missingResponse", "ids": missing}
+        
+        emails = [found[email_id] for email_id in email_ids if email_id in found]
+        args = {"list": emails, "notFound": not_found}
+        if error:
+            args["error"] = error
+        return {"methodResponses": [["Email/get", args, "g1"]]}
+
+    def _remember_emails(self, emails: list):
+        for email in emails:
+            size = sum(len(part.get("value", "")) for part in (email.get("bodyValues") or {}).values())
+            if size > EMAIL_CACHE_BYTES:
+                continue
+            old = self._email_cache.pop(email["id"], None)
+            if old:
+                self._email_cache_bytes -= old[1]
+            self._email_cache[email["id"]] = (email, size)
+            self._email_cache_bytes += size
+        while len(self._email_cache) > self._email_cache_size or self._email_cache_bytes > EMAIL_CACHE_BYTES:
+            self._email_cache_bytes -= self._email_cache.popitem(last=False)[1][1]
+
+    def _mailbox_get_call(self) -> list:
+        return ["Mailbox/get", {
+            "accountId": self.account_id,
+            "properties": ["id", "name", "role", "totalEmails", "unreadEmails"]
+        }, "m1"]
+
+    async def list_mailboxes(self) -> dict:
+        if self._mailboxes_result and self._mailboxes_result[1] > time.monotonic():
+            return self._mailboxes_result[0]
+
+        await self.get_session()
+        result = await self.make_jmap_request([self._mailbox_get_call()])
+        responses = by_cid(result)
+        if responses.get("m1", ("error",))[0] != "error":
+            self._mailboxes_result = (result, time.monotonic() + self._mailbox_cache_ttl)
+            self._remember_mailboxes(response_list(responses, "m1", "Mailbox/get"))
+        return result
+
+    def _mailbox_map_fresh(self) -> bool:
+        return self._mailbox_map is not None and time.monotonic() - self._mailbox_map_ts < self._mailbox_cache_ttl
+
+    def _mailbox_map_needs_fetch(self, key: str) -> bool:
+        """True if the map is stale, or lacks key and was not fetched in the last few seconds."""
+        if not self._mailbox_map_fresh():
+            return True
+        # A mailbox created within the TTL is unknown to the cached map;
+        # refetch once on a miss, rate-limited so bad names cannot hammer the API.
+        return key not in self._mailbox_map and time.monotonic() - self._mailbox_map_ts >= self._mailbox_miss_refetch_interval
+
+    async def get_mailbox_id(self, mailbox_name: str) -> Optional[str]:
+        key = mailbox_name.lower()
+        if self._mailbox_map_needs_fetch(key):
+            async with self._mailbox_lock:
+                # Another caller may have refreshed the map while we waited.
+                if self._mailbox_map_needs_fetch(key):
+                    self._mailboxes_result = None
+                    await self.list_mailboxes()
+        return (self._mailbox_map or {}).get(key)
+
+    def _remember_mailboxes(self, mailboxes: list):
+        mailbox_map = {}
+        for mailbox in mailboxes:
+            if mailbox.get("role"):
+                mailbox_map[mailbox["role"].lower()] = mailbox["id"]
+            mailbox_map[mailbox["name"].lower()] = mailbox["id"]
+        self._mailbox_map = mailbox_map
+        self._mailbox_map_ts = time.monotonic()
+
+    def invalidate_mailboxes(self):
+        """Drop cached mailbox ids, e.g. after a mailbox is created or renamed."""
+        self._mailbox_map = None
+        self._mailboxes_result = None
+
+    def invalidate(self):
+        """Drop all cached search, email and mailbox results, e.g. after a write."""
+        self._search_cache.clear()
+        self._email_cache.clear()
+        self._email_cache_bytes = 0
+        self.invalidate_mailboxes()
+
+    async def close(self):
+        """Kept for compatibility; the shared connection pool is closed by aclose_http()."""
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 import os
-import asyncio
+import hashlib
+import functools
 import httpx
 from typing import Optional
+from collections import OrderedDict
 from contextvars import ContextVar
 from mcp.server.fastmcp import FastMCP
-from mcp.types import TextContent, ToolAnnotations
+from mcp.types import ToolAnnotations
+
+from fastmail_client import FastmailClient, by_cid, response_list
 
 _request_config: Optional[ContextVar[dict]] = None
 
@@ -28,126 +32,25 @@ def get_api_token() -> str:
         if token:
             return token
     
+    return _get_env_api_token()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_env_api_token() -> str:
+    """Resolve the token from the environment once; call cache_clear() after rotating it."""
     return (
         os.getenv("FASTMAIL_API_TOKEN", "") or
         os.getenv("fastmailApiToken", "") or
-        os.getenv("fastmail_api_token", "")
+        os.getenv("fastmail_api_token", "") or
+        os.getenv("CONFIG_FASTMAIL_API_TOKEN", "") or
+        os.getenv("CONFIG_fastmailApiToken", "") or
+        os.getenv("SMITHERY_FASTMAIL_API_TOKEN", "") or
+        os.getenv("SMITHERY_fastmailApiToken", "") or
+        os.getenv("MCP_FASTMAIL_API_TOKEN", "") or
+        os.getenv("MCP_fastmailApiToken", "")
     )
 
 
-SESSION_URL = "https://api.fastmail.com/jmap/session"
-
-
-class FastmailClient:
-    def __init__(self, api_token: str):
-        self.api_token = api_token
-        self.session_data = None
-        self.account_id = None
-        self.api_url = None
-        self.client = httpx.AsyncClient()
-
-    async def get_session(self):
-        if self.session_data is None:
-            headers = {
-                "Authorization": f"Bearer {self.api_token}",
-                "Content-Type": "application/json"
-            }
-            response = await self.client.get(SESSION_URL, headers=headers)
-            response.raise_for_status()
-            self.session_data = response.json()
-            self.account_id = self.session_data["primaryAccounts"]["urn:ietf:params:jmap:mail"]
-            self.api_url = self.session_data["apiUrl"]
-        return self.session_data
-
-    async def make_jmap_request(self, method_calls: list) -> dict:
-        await self.get_session()
-        if not self.api_url:
-            raise ValueError("API URL not available - session may have failed")
-        headers = {
-            "Authorization": f"Bearer {self.api_token}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "using": [
-                "urn:ietf:params:jmap:core",
-                "urn:ietf:params:jmap:mail"
-            ],
-            "methodCalls": method_calls
-        }
-        response = await self.client.post(self.api_url, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
-
-    async def search_emails(self, query: str = "", limit: int = 10, mailbox: Optional[str] = None) -> dict:
-        filter_conditions = {}
-        
-        if query:
-            filter_conditions["text"] = query
-        
-        if mailbox:
-            mailbox_id = await self.get_mailbox_id(mailbox)
-            if mailbox_id:
-                filter_conditions["inMailbox"] = mailbox_id
-        
-        method_calls = [
-            ["Email/query", {
-                "accountId": self.account_id,
-                "filter": filter_conditions if filter_conditions else None,
-                "sort": [{"property": "receivedAt", "isAscending": False}],
-                "limit": limit
-            }, "q1"],
-            ["Email/get", {
-                "accountId": self.account_id,
-                "#ids": {
-                    "resultOf": "q1",
-                    "name": "Email/query",
-                    "path": "/ids"
-                },
-                "properties": ["id", "subject", "from", "to", "receivedAt", "preview", "mailboxIds"]
-            }, "g1"]
-        ]
-        
-        result = await self.make_jmap_request(method_calls)
-        return result
-
-    async def get_email(self, email_id: str) -> dict:
-        method_calls = [
-            ["Email/get", {
-                "accountId": self.account_id,
-                "ids": [email_id],
-                "properties": ["id", "subject", "from", "to", "cc", "bcc", "receivedAt", "sentAt", "textBody", "htmlBody", "bodyValues", "attachments"],
-                "fetchTextBodyValues": True
-            }, "g1"]
-        ]
-        
-        result = await self.make_jmap_request(method_calls)
-        return result
-
-    async def list_mailboxes(self) -> dict:
-        method_calls = [
-            ["Mailbox/get", {
-                "accountId": self.account_id,
-                "properties": ["id", "name", "role", "totalEmails", "unreadEmails"]
-            }, "m1"]
-        ]
-        
-        result = await self.make_jmap_request(method_calls)
-        return result
-
-    async def get_mailbox_id(self, mailbox_name: str) -> Optional[str]:
-        mailboxes_result = await self.list_mailboxes()
-        mailboxes = mailboxes_result.get("methodResponses", [[]])[0][1].get("list", [])
-        
-        for mailbox in mailboxes:
-            if mailbox["name"].lower() == mailbox_name.lower() or mailbox.get("role", "").lower() == mailbox_name.lower():
-                return mailbox["id"]
-        
-        return None
-
-    async def close(self):
-        await self.client.aclose()
-
-
 mcp = FastMCP(
     "fastmail-mcp",
     instructions="""You are an AI assistant with access to the user's Fastmail email account. 
@@ -156,23 +59,158 @@ Always be helpful and respect user privacy.
 When searching, provide clear summaries of found emails.
 When reading emails, present the content in a readable format."""
 )
-fastmail_client = None
+_clients: OrderedDict[str, FastmailClient] = OrderedDict()
+_MAX_CLIENTS = 16
 
 
 def get_client() -> FastmailClient:
-    global fastmail_client
-    if fastmail_client is None:
-        token = get_api_token()
-        if not token:
-            raise ValueError("FASTMAIL_API_TOKEN is not configured. Please provide your Fastmail API token in the configuration.")
-        fastmail_client = FastmailClient(token)
-    return fastmail_client
+    """Return the client for the current request's token, creating it on first use.
+
+    Smithery passes a token per request, so clients are keyed by token rather
+    than shared. Each client holds its own email/search caches, so only the
+    _MAX_CLIENTS most recently used tokens are kept. Construction never awaits,
+    so the lookup-and-insert cannot interleave with another task on the event loop.
+    """
+    token = get_api_token()
+    if not token:
+        raise ValueError("FASTMAIL_API_TOKEN is not configured. Please provide your Fastmail API token in the configuration.")
+    key = hashlib.blake2b(token.encode(), digest_size=8).hexdigest()
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = FastmailClient(token)
+        while len(_clients) > _MAX_CLIENTS:
+            _clients.popitem(last=False)
+    else:
+        _clients.move_to_end(key)
+    return client
 
 
 def is_token_configured() -> bool:
     return bool(get_api_token())
 
 
+def _tool_safe(action: str = ""):
+    """Turn exceptions from a tool/resource handler into a short error string.
+
+    HTTP errors are reported by status code only: str() of an httpx error
+    drags in the full request/response description. Anything else is
+    reported as "<ExceptionType>: <message>".
+    """
+    prefix = f"Error {action}: " if action else "Error: "
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 401:
+                    return prefix + "HTTP 401 - the Fastmail API token was rejected. Check that it is valid and has not been revoked."
+                return prefix + f"HTTP {e.response.status_code}"
+            except Exception as e:
+                # Timeouts and similar httpx errors often have an empty message.
+                return prefix + (f"{type(e).__name__}: {e}" if str(e) else type(e).__name__)
+        return wrapper
+    return decorator
+
+
+_EMPTY = ({},)
+
+
+def _sender(email: dict) -> dict:
+    """Return the first "from" address, or an empty dict if there is none."""
+    return (email.get("from") or _EMPTY)[0]
+
+
+_MAX_LISTED_RECIPIENTS = 20
+
+# Full-body search results are capped far below the summary limit: 50 bodies
+# of up to MAX_BODY_VALUE_BYTES each would be a ~12 MiB tool result.
+_MAX_BODY_SEARCH_RESULTS = 10
+
+
+def _fmt_addrs(addrs: Optional[list]) -> str:
+    """Join addresses as "Name <email>", listing at most _MAX_LISTED_RECIPIENTS of them."""
+    addrs = addrs or ()
+    shown = ", ".join(f"{name} <{addr}>" for name, addr in ((a.get("name", ""), a.get("email", "")) for a in addrs[:_MAX_LISTED_RECIPIENTS]))
+    if len(addrs) > _MAX_LISTED_RECIPIENTS:
+        shown += f" (+{len(addrs) - _MAX_LISTED_RECIPIENTS} more)"
+    return shown
+
+
+_EMAIL_FMT = "ID: {id}\nSubject: {subject}\nFrom: {from_name} <{from_addr}>\nDate: {date}\nPreview: {preview}\n"
+
+
+def _project_email(email: dict) -> dict:
+    """Flatten an Email/get summary into the fields used by _EMAIL_FMT."""
+    frm = _sender(email)
+    return {
+        "id": email["id"],
+        "subject": email.get("subject", "No subject"),
+        "from_name": frm.get("name", ""),
+        "from_addr": frm.get("email", "Unknown"),
+        "date": email.get("receivedAt", "Unknown"),
+        "preview": email.get("preview", ""),
+    }
+
+
+_MAILBOX_FMT = "Name: {name}\nRole: {role}\nTotal Emails: {total}\nUnread Emails: {unread}"
+_MAILBOX_LINE_FMT = "- **{name}** ({role}): {total} total, {unread} unread"
+
+
+def _project_mailbox(mailbox: dict) -> dict:
+    """Flatten a Mailbox/get entry into the fields used by the mailbox templates."""
+    return {
+        "name": mailbox.get("name", "Unknown"),
+        "role": mailbox.get("role") or "custom",
+        "total": mailbox.get("totalEmails", 0),
+        "unread": mailbox.get("unreadEmails", 0),
+    }
+
+
+def _format_email(email: dict) -> str:
+    """Render a full Email/get entry for the get_email and get_emails tools."""
+    frm = _sender(email)
+    from_addr = frm.get("email", "Unknown")
+    from_name = frm.get("name", "")
+    to_list = _fmt_addrs(email.get("to"))
+    cc_list = _fmt_addrs(email.get("cc"))
+    
+    body_text = ""
+    text_body_ids = email.get("textBody", [])
+    body_values = email.get("bodyValues", {})
+    
+    if text_body_ids and body_values:
+        for part in text_body_ids:
+            part_id = part.get("partId") if isinstance(part, dict) else part
+            if part_id in body_values:
+                body_text = body_values[part_id].get("value", "")
+                if body_values[part_id].get("isTruncated"):
+                    body_text += "\n\n[Body truncated]"
+                break
+    
+    attachments_info = ""
+    if email.get("attachments"):
+        attachments_info = "\n\nAttachments:\n" + "\n".join([
+            f"- {att.get('name', 'Unknown')} ({att.get('type', 'Unknown type')}, {att.get('size', 0)} bytes)"
+            for att in email["attachments"]
+        ])
+    
+    cc_line = f"\nCC: {cc_list}" if cc_list else ""
+    
+    formatted_email = (
+        f"Subject: {email.get('subject', 'No subject')}\n"
+        f"From: {from_name} <{from_addr}>\n"
+        f"To: {to_list}"
+        f"{cc_line}\n"
+        f"Date: {email.get('receivedAt', 'Unknown')}\n"
+        f"{attachments_info}\n"
+        f"\n--- Email Body ---\n{body_text}"
+    )
+    
+    return formatted_email
+
+
 @mcp.tool(
     annotations=ToolAnnotations(
         title="Search Emails",
@@ -182,10 +220,12 @@ def is_token_configured() -> bool:
         openWorldHint=True
     )
 )
+@_tool_safe("searching emails")
 async def search_emails(
     query: str = "",
     limit: int = 10,
-    mailbox: str = ""
+    mailbox: str = "",
+    include_body: bool = False
 ) -> str:
     """Search emails in your Fastmail account by text query and optionally filter by mailbox.
     
@@ -196,42 +236,29 @@ async def search_emails(
         query: Search query text to find in emails. Searches subject, body, from, and to fields. Leave empty to get the most recent emails.
         limit: Maximum number of emails to return. Default is 10, maximum allowed is 50. Use smaller values for faster responses.
         mailbox: Filter results to a specific mailbox/folder. Common values: 'inbox', 'sent', 'drafts', 'archive', 'trash', 'spam'. Leave empty to search all mailboxes.
+        include_body: Also return each email's full body, recipients, and attachments, as get_email would, in the same request. With include_body, at most 10 emails are returned regardless of limit.
     
     Returns:
-        A formatted list of matching emails with ID, subject, sender, date, and preview.
+        A formatted list of matching emails with ID, subject, sender, date, and preview, or full emails when include_body is set.
     """
-    try:
-        client = get_client()
-        limit = min(int(limit), 50)
-        mailbox_filter = mailbox if mailbox else None
-        
-        result = await client.search_emails(query, limit, mailbox_filter)
-        
-        emails = []
-        for response in result.get("methodResponses", []):
-            if response[0] == "Email/get":
-                emails = response[1].get("list", [])
-                break
-        
-        if not emails:
-            return "No emails found matching your search criteria."
-        
-        formatted_emails = []
-        for email in emails:
-            from_addr = email.get("from", [{}])[0].get("email", "Unknown")
-            from_name = email.get("from", [{}])[0].get("name", "")
-            formatted_emails.append(
-                f"ID: {email['id']}\n"
-                f"Subject: {email.get('subject', 'No subject')}\n"
-                f"From: {from_name} <{from_addr}>\n"
-                f"Date: {email.get('receivedAt', 'Unknown')}\n"
-                f"Preview: {email.get('preview', '')}\n"
-            )
-        
-        return f"Found {len(emails)} email(s):\n\n" + "\n---\n".join(formatted_emails)
-        
-    except Exception as e:
-        return f"Error searching emails: {str(e)}"
+    client = get_client()
+    limit = min(int(limit), _MAX_BODY_SEARCH_RESULTS if include_body else 50)
+    mailbox_filter = mailbox if mailbox else None
+    
+    result = await client.search_and_fetch(query, limit, mailbox_filter, with_body=include_body)
+    
+    emails = response_list(by_cid(result), "g1", "Email/get")
+    
+    if not emails:
+        return "No emails found matching your search criteria."
+    
+    if include_body:
+        formatted_emails = [f"ID: {email['id']}\n" + _format_email(email) for email in emails]
+        return f"Found {len(emails)} email(s):\n\n" + "\n\n======\n\n".join(formatted_emails)
+    
+    formatted_emails = [_EMAIL_FMT.format_map(_project_email(email)) for email in emails]
+    
+    return f"Found {len(emails)} email(s):\n\n" + "\n---\n".join(formatted_emails)
 
 
 @mcp.tool(
@@ -243,6 +270,7 @@ async def search_emails(
         openWorldHint=False
     )
 )
+@_tool_safe("retrieving email")
 async def get_email(email_id: str) -> str:
     """Retrieve the full content of a specific email by its unique ID.
     
@@ -255,63 +283,71 @@ async def get_email(email_id: str) -> str:
     Returns:
         The complete email with subject, sender, recipients, date, body text, and attachment list.
     """
-    try:
-        if not email_id:
-            return "Error: email_id is required. Use search_emails first to find email IDs."
-        
-        client = get_client()
-        result = await client.get_email(email_id)
-        
-        email = None
-        for response in result.get("methodResponses", []):
-            if response[0] == "Email/get":
-                emails_list = response[1].get("list", [])
-                if emails_list:
-                    email = emails_list[0]
-                break
-        
-        if not email:
-            return f"Email with ID '{email_id}' not found. The email may have been deleted or the ID may be incorrect."
-        
-        from_addr = email.get("from", [{}])[0].get("email", "Unknown")
-        from_name = email.get("from", [{}])[0].get("name", "")
-        to_list = ", ".join([f"{t.get('name', '')} <{t.get('email', '')}>" for t in email.get("to", [])])
-        cc_list = ", ".join([f"{t.get('name', '')} <{t.get('email', '')}>" for t in email.get("cc", [])]) if email.get("cc") else ""
-        
-        body_text = ""
-        text_body_ids = email.get("textBody", [])
-        body_values = email.get("bodyValues", {})
-        
-        if text_body_ids and body_values:
-            for part in text_body_ids:
-                part_id = part.get("partId") if isinstance(part, dict) else part
-                if part_id in body_values:
-                    body_text = body_values[part_id].get("value", "")
-                    break
-        
-        attachments_info = ""
-        if email.get("attachments"):
-            attachments_info = "\n\nAttachments:\n" + "\n".join([
-                f"- {att.get('name', 'Unknown')} ({att.get('type', 'Unknown type')}, {att.get('size', 0)} bytes)"
-                for att in email["attachments"]
-            ])
-        
-        cc_line = f"\nCC: {cc_list}" if cc_list else ""
-        
-        formatted_email = (
-            f"Subject: {email.get('subject', 'No subject')}\n"
-            f"From: {from_name} <{from_addr}>\n"
-            f"To: {to_list}"
-            f"{cc_line}\n"
-            f"Date: {email.get('receivedAt', 'Unknown')}\n"
-            f"{attachments_info}\n"
-            f"\n--- Email Body ---\n{body_text}"
-        )
-        
-        return formatted_email
-        
-    except Exception as e:
-        return f"Error retrieving email: {str(e)}"
+    if not email_id:
+        return "Error: email_id is required. Use search_emails first to find email IDs."
+    
+    client = get_client()
+    result = await client.get_email(email_id)
+    
+    name, args = by_cid(result).get("g1", ("", {}))
+    emails_list = args.get("list", []) if name == "Email/get" else []
+    email = emails_list[0] if emails_list else None
+    
+    if not email:
+        if args.get("error"):
+            return f"Error retrieving email: JMAP {args['error']['type']}"
+        return f"Email with ID '{email_id}' not found. The email may have been deleted or the ID may be incorrect."
+    
+    return _format_email(email)
+
+
+@mcp.tool(
+    annotations=ToolAnnotations(
+        title="Get Multiple Emails",
+        readOnlyHint=True,
+        destructiveHint=False,
+        idempotentHint=True,
+        openWorldHint=False
+    )
+)
+@_tool_safe("retrieving emails")
+async def get_emails(email_ids: list[str]) -> str:
+    """Retrieve the full content of several emails at once by their IDs.
+    
+    Use this instead of calling get_email repeatedly when you need to read
+    multiple search results; all emails are fetched in a single request.
+    
+    Args:
+        email_ids: The unique identifiers of the emails to retrieve (up to 50). Obtain these from the search_emails tool results.
+    
+    Returns:
+        Each email with its ID, subject, sender, recipients, date, body text, and attachment list.
+    """
+    email_ids = list(dict.fromkeys(i for i in email_ids if i))
+    if not email_ids:
+        return "Error: email_ids is required. Use search_emails first to find email IDs."
+    if len(email_ids) > 50:
+        return "Error: at most 50 email IDs can be retrieved at once."
+    
+    client = get_client()
+    result = await client.get_emails(email_ids)
+    
+    name, args = by_cid(result).get("g1", ("", {}))
+    emails = args.get("list", []) if name == "Email/get" else []
+    not_found = args.get("notFound") or []
+    error = args.get("error")
+    
+    if not emails:
+        if error:
+            return f"Error retrieving emails: JMAP {error['type']}"
+        return "None of the requested emails were found. They may have been deleted or the IDs may be incorrect."
+    
+    formatted_emails = [f"ID: {email['id']}\n" + _format_email(email) for email in emails]
+    missing_line = f"\n\nNot found: {', '.join(not_found)}" if not_found else ""
+    if error:
+        missing_line += f"\n\nCould not retrieve (JMAP {error['type']}): {', '.join(error['ids'])}"
+    
+    return f"Retrieved {len(emails)} email(s):\n\n" + "\n\n======\n\n".join(formatted_emails) + missing_line
 
 
 @mcp.tool(
@@ -323,43 +359,33 @@ async def get_email(email_id: str) -> str:
         openWorldHint=False
     )
 )
-async def list_mailboxes() -> str:
+@_tool_safe("listing mailboxes")
+async def list_mailboxes(refresh: bool = False) -> str:
     """List all mailboxes (folders) in your Fastmail account with email counts.
     
     This tool retrieves all available mailboxes including inbox, sent, drafts,
     archive, trash, spam, and any custom folders. Shows the total and unread
     email count for each mailbox.
     
+    Args:
+        refresh: Bypass the short-lived mailbox cache and fetch current counts from the server. Use when the user asks for up-to-date unread counts.
+    
     Returns:
         A formatted list of all mailboxes with their names, roles, total emails, and unread counts.
     """
-    try:
-        client = get_client()
-        result = await client.list_mailboxes()
-        
-        mailboxes = []
-        for response in result.get("methodResponses", []):
-            if response[0] == "Mailbox/get":
-                mailboxes = response[1].get("list", [])
-                break
-        
-        if not mailboxes:
-            return "No mailboxes found in this account."
-        
-        formatted_mailboxes = []
-        for mailbox in mailboxes:
-            role = mailbox.get('role', 'custom')
-            formatted_mailboxes.append(
-                f"Name: {mailbox.get('name', 'Unknown')}\n"
-                f"Role: {role if role else 'custom'}\n"
-                f"Total Emails: {mailbox.get('totalEmails', 0)}\n"
-                f"Unread Emails: {mailbox.get('unreadEmails', 0)}"
-            )
-        
-        return f"Found {len(mailboxes)} mailbox(es):\n\n" + "\n---\n".join(formatted_mailboxes)
-        
-    except Exception as e:
-        return f"Error listing mailboxes: {str(e)}"
+    client = get_client()
+    if refresh:
+        client.invalidate_mailboxes()
+    result = await client.list_mailboxes()
+    
+    mailboxes = response_list(by_cid(result), "m1", "Mailbox/get")
+    
+    if not mailboxes:
+        return "No mailboxes found in this account."
+    
+    formatted_mailboxes = [_MAILBOX_FMT.format_map(_project_mailbox(mailbox)) for mailbox in mailboxes]
+    
+    return f"Found {len(mailboxes)} mailbox(es):\n\n" + "\n---\n".join(formatted_mailboxes)
 
 
 @mcp.prompt()
@@ -387,81 +413,62 @@ def find_attachments(topic: str) -> str:
 
 
 @mcp.resource("mailboxes://list")
+@_tool_safe()
 async def get_mailboxes_resource() -> str:
     """List of all mailboxes in the Fastmail account."""
-    try:
-        client = get_client()
-        result = await client.list_mailboxes()
-        
-        mailboxes = []
-        for response in result.get("methodResponses", []):
-            if response[0] == "Mailbox/get":
-                mailboxes = response[1].get("list", [])
-                break
-        
-        if not mailboxes:
-            return "No mailboxes found."
-        
-        lines = ["# Fastmail Mailboxes", ""]
-        for mb in mailboxes:
-            role = mb.get('role', 'custom') or 'custom'
-            lines.append(f"- **{mb.get('name', 'Unknown')}** ({role}): {mb.get('totalEmails', 0)} total, {mb.get('unreadEmails', 0)} unread")
-        
-        return "\n".join(lines)
-    except Exception as e:
-        return f"Error: {str(e)}"
+    client = get_client()
+    result = await client.list_mailboxes()
+    
+    mailboxes = response_list(by_cid(result), "m1", "Mailbox/get")
+    
+    if not mailboxes:
+        return "No mailboxes found."
+    
+    lines = ["# Fastmail Mailboxes", ""]
+    lines.extend(_MAILBOX_LINE_FMT.format_map(_project_mailbox(mb)) for mb in mailboxes)
+    
+    return "\n".join(lines)
 
 
 @mcp.resource("emails://recent")
+@_tool_safe()
 async def get_recent_emails_resource() -> str:
     """Most recent 10 emails from the inbox."""
-    try:
-        client = get_client()
-        result = await client.search_emails("", 10, "inbox")
-        
-        emails = []
-        for response in result.get("methodResponses", []):
-            if response[0] == "Email/get":
-                emails = response[1].get("list", [])
-                break
-        
-        if not emails:
-            return "No recent emails found."
-        
-        lines = ["# Recent Emails", ""]
-        for email in emails:
-            from_addr = email.get("from", [{}])[0].get("email", "Unknown")
-            from_name = email.get("from", [{}])[0].get("name", from_addr)
-            subject = email.get('subject', 'No subject')
-            date = email.get('receivedAt', 'Unknown')
-            lines.append(f"- **{subject}** from {from_name} ({date})")
-        
-        return "\n".join(lines)
-    except Exception as e:
-        return f"Error: {str(e)}"
+    client = get_client()
+    result = await client.search_emails("", 10, "inbox")
+    
+    emails = response_list(by_cid(result), "g1", "Email/get")
+    
+    if not emails:
+        return "No recent emails found."
+    
+    lines = ["# Recent Emails", ""]
+    for email in emails:
+        frm = _sender(email)
+        from_addr = frm.get("email", "Unknown")
+        from_name = frm.get("name", from_addr)
+        subject = email.get('subject', 'No subject')
+        date = email.get('receivedAt', 'Unknown')
+        lines.append(f"- **{subject}** from {from_name} ({date})")
+    
+    return "\n".join(lines)
 
 
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "--http":
-        import uvicorn
-        from starlette.applications import Starlette
-        from starlette.routing import Mount
-        import contextlib
-        
-        mcp.settings.stateless_http = True
-        
-        @contextlib.asynccontextmanager
-        async def lifespan(app):
-            async with mcp.session_manager.run():
-                yield
-        
-        app = Starlette(
-            routes=[Mount("/", mcp.streamable_http_app())],
-            lifespan=lifespan
-        )
+        # Let main.py import this already-initialised module instead of
+        # executing it a second time and building another FastMCP server.
+        sys.modules.setdefault("fastmail_mcp", sys.modules[__name__])
+        import main
         
-        uvicorn.run(app, host="0.0.0.0", port=8000)
+        main.run(default_port=8000)
     else:
+        try:
+            import asyncio
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
         mcp.run(transport="stdio")
@@ -2,13 +2,21 @@
 """
 HTTP entry point for Smithery deployment.
 Handles configuration from query parameters as required by Smithery HTTP transport.
+
+This is the only HTTP entry point; `python fastmail_mcp.py --http` runs it too.
+Optional environment variables:
+    MCP_ALLOWED_HOSTS     comma-separated Host header allow-list; setting it turns on
+                          DNS rebinding protection (default: unset, no checks)
+    MCP_ALLOWED_ORIGINS   comma-separated Origin allow-list used with MCP_ALLOWED_HOSTS
+                          (default: https://<host> for each allowed host)
+    MCP_ENABLE_CONFIG_MW  set to 0 to ignore per-request query-parameter config
 """
 import os
 import uvicorn
 from contextvars import ContextVar
 from starlette.applications import Starlette
 from starlette.routing import Route
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response
 from starlette.middleware import Middleware
 from starlette.middleware.base import BaseHTTPMiddleware
 import contextlib
@@ -16,6 +24,7 @@ import contextlib
 request_config: ContextVar[dict] = ContextVar("request_config", default={})
 
 from fastmail_mcp import mcp, set_request_config_var
+from fastmail_client import aclose_http
 
 set_request_config_var(request_config)
 
@@ -32,48 +41,31 @@ class ConfigMiddleware(BaseHTTPMiddleware):
 mcp.settings.stateless_http = True
 mcp.settings.host = "0.0.0.0"
 
-mcp.settings.transport_security.enable_dns_rebinding_protection = False
-mcp.settings.transport_security.allowed_hosts = ["*"]
-mcp.settings.transport_security.allowed_origins = ["*"]
+def _env_list(name: str) -> list[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+# Host/Origin checks only run with DNS rebinding protection on, so turn it on
+# exactly when an allow-list is configured. Origins are full URLs, so they
+# default to https://<host> for each allowed host.
+_allowed_hosts = _env_list("MCP_ALLOWED_HOSTS")
+mcp.settings.transport_security.enable_dns_rebinding_protection = bool(_allowed_hosts)
+mcp.settings.transport_security.allowed_hosts = _allowed_hosts or ["*"]
+mcp.settings.transport_security.allowed_origins = _env_list("MCP_ALLOWED_ORIGINS") or [f"https://{host}" for host in _allowed_hosts] or ["*"]
 
 mcp_http_app = mcp.streamable_http_app()
 
 @contextlib.asynccontextmanager
 async def lifespan(app):
     async with mcp.session_manager.run():
-        yield
+        try:
+            yield
+        finally:
+            await aclose_http()
+
+_HEALTH_BODY = b'{"status":"ok","service":"fastmail-mcp"}'
 
 async def health_check(request):
-    return JSONResponse({"status": "ok", "service": "fastmail-mcp"})
-
-async def mcp_handler(request):
-    config = dict(request.query_params)
-    token = request_config.set(config)
-    try:
-        response = await mcp_http_app(request.scope, request.receive, request._send)
-        return response
-    except Exception:
-        scope = request.scope
-        receive = request.receive
-        
-        async def send(message):
-            pass
-        
-        await mcp_http_app(scope, receive, send)
-        return Response(status_code=200)
-    finally:
-        request_config.reset(token)
-
-async def mcp_options(request):
-    return Response(
-        status_code=200,
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-            "Access-Control-Allow-Headers": "Content-Type, Authorization, mcp-session-id, *",
-            "Access-Control-Expose-Headers": "mcp-session-id, mcp-protocol-version",
-        }
-    )
+    return Response(_HEALTH_BODY, media_type="application/json", headers={"cache-control": "no-store"})
 
 from starlette.routing import Mount
 
@@ -83,12 +75,12 @@ app = Starlette(
         Mount("/mcp", app=mcp_http_app),
         Mount("/", app=mcp_http_app),
     ],
-    middleware=[Middleware(ConfigMiddleware)],
+    middleware=[Middleware(ConfigMiddleware)] if os.getenv("MCP_ENABLE_CONFIG_MW", "1") != "0" else [],
     lifespan=lifespan
 )
 
-if __name__ == "__main__":
-    port = int(os.getenv("PORT", "8081"))
+def run(default_port: int = 8081):
+    port = int(os.getenv("PORT", str(default_port)))
     host = os.getenv("HOST", "0.0.0.0")
     print(f"Starting Fastmail MCP server on {host}:{port}")
     uvicorn.run(
@@ -98,3 +90,6 @@ if __name__ == "__main__":
         forwarded_allow_ips="*",
         proxy_headers=True
     )
+
+if __name__ == "__main__":
+    run()
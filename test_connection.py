@@ -1,10 +1,24 @@
 #!/usr/bin/env python3
 import os
 import asyncio
-import httpx
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def load_env_file(path: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")):
+    """Read KEY=VALUE lines from .env into os.environ without overriding existing values."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.removeprefix("export ").split("=", 1)
+                os.environ.setdefault(key.strip(), value.strip().strip("'\""))
+    except OSError:
+        pass
+
+
+if "FASTMAIL_API_TOKEN" not in os.environ:
+    load_env_file()
 
 FASTMAIL_API_TOKEN = os.getenv("FASTMAIL_API_TOKEN", "")
 SESSION_URL = "https://api.fastmail.com/jmap/session"
@@ -30,6 +44,8 @@ async def test_connection():
     print(f"✓ API Token found (length: {len(FASTMAIL_API_TOKEN)} chars)")
     print()
     
+    import httpx
+    
     try:
         async with httpx.AsyncClient() as client:
             print("Testing connection to Fastmail JMAP API...")